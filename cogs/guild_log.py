@@ -57,13 +57,12 @@ class GuildLog(commands.Cog):
 
             # can only properly recover images
             if attachment.filename.endswith(VALID_IMAGE_FORMATS):
-                buf = BytesIO()
                 try:
-                    await attachment.save(buf, use_cached=True)
+                    data = await attachment.read(use_cached=True)
                 except discord.HTTPException:
                     pass
                 else:
-                    file = discord.File(buf, filename=attachment.filename)
+                    file = discord.File(BytesIO(data), filename=attachment.filename)
                     embed.set_image(url=f'attachment://{attachment.filename}')
 
         author = message.author
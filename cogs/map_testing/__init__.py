@@ -1,21 +1,19 @@
 import logging
 import re
 from datetime import datetime, timedelta
-from io import BytesIO
 from typing import List, Optional
 
+import aiohttp
 import discord
 from discord.ext import commands, tasks
 
 from cogs.map_testing.log import TestLog
-from cogs.map_testing.map_channel import MapChannel, MapState
+from cogs.map_testing.map_channel import CAT_EVALUATED_MAPS, CAT_MAP_TESTING, CAT_WAITING_MAPPER, MapChannel, MapState
 from cogs.map_testing.submission import InitialSubmission, Submission, SubmissionState
+from utils.text import sanitize
 
 log = logging.getLogger(__name__)
 
-CAT_MAP_TESTING     = 449352010072850443
-CAT_WAITING_MAPPER  = 746076708196843530
-CAT_EVALUATED_MAPS  = 462954029643989003
 CHAN_ANNOUNCEMENTS  = 420565311863914496
 CHAN_INFO           = 455392314173554688
 CHAN_SUBMIT_MAPS    = 455392372663123989
@@ -25,6 +23,8 @@ ROLE_TESTER         = 293543421426008064
 ROLE_TESTING        = 455814387169755176
 WH_MAP_RELEASES     = 345299155381649408
 
+_MAP_URL_RE = re.compile(r'\[(?P<name>.+)\]\(<?https://ddnet\.tw/(?:maps|mappreview)/\?map=.+?>?\)')
+
 
 def is_testing(channel: discord.TextChannel) -> bool:
     return isinstance(channel, discord.TextChannel) and channel.category_id in (CAT_MAP_TESTING, CAT_WAITING_MAPPER, CAT_EVALUATED_MAPS)
@@ -54,6 +54,7 @@ class MapTesting(commands.Cog):
         self.bot = TestLog.bot = bot
 
         self._map_channels = {}
+        self._map_channel_filenames = {}
         self._active_submissions = set()
 
         bot.loop.create_task(self.load_map_channels())
@@ -72,21 +73,38 @@ class MapTesting(commands.Cog):
                     continue
 
                 try:
-                    self._map_channels[channel.id] = MapChannel(channel)
+                    map_channel = MapChannel(channel)
                 except ValueError as exc:
                     log.error('Failed loading map channel #%s: %s', channel, exc)
+                else:
+                    self.add_map_channel(map_channel)
 
     @property
     def map_channels(self) -> List[MapChannel]:
         return self._map_channels.values()
 
-    def get_map_channel(self, channel_id: Optional[int]=None, **kwargs) -> Optional[MapChannel]:
+    def get_map_channel(self, channel_id: Optional[int]=None, *, name: Optional[str]=None,
+                        filename: Optional[str]=None) -> Optional[MapChannel]:
         if channel_id is not None:
             return self._map_channels.get(channel_id)
-        else:
-            return discord.utils.get(self.map_channels, **kwargs)
 
-    async def ddnet_upload(self, asset_type: str, buf: BytesIO, filename: str):
+        if name is not None:
+            filename = sanitize(name)
+
+        return self._map_channel_filenames.get(filename)
+
+    def add_map_channel(self, map_channel: MapChannel):
+        self._map_channels[map_channel.id] = map_channel
+        self._map_channel_filenames[map_channel.filename] = map_channel
+
+    def remove_map_channel(self, map_channel: MapChannel, *, filename: Optional[str]=None):
+        self._map_channels.pop(map_channel.id, None)
+
+        filename = filename or map_channel.filename
+        if self._map_channel_filenames.get(filename) is map_channel:
+            del self._map_channel_filenames[filename]
+
+    async def ddnet_upload(self, asset_type: str, data: bytes, filename: str):
         url = self.bot.config.get('DDNET', 'UPLOAD')
         headers = {'X-DDNet-Token': self.bot.config.get('DDNET', 'TOKEN')}
 
@@ -99,13 +117,12 @@ class MapTesting(commands.Cog):
         else:
             raise ValueError('Invalid asset type')
 
-        data = {
-            'asset_type': asset_type,
-            'file': buf,
-            name: filename
-        }
+        form = aiohttp.FormData()
+        form.add_field('asset_type', asset_type)
+        form.add_field('file', data, filename=filename, content_type='application/octet-stream')
+        form.add_field(name, filename)
 
-        async with self.bot.session.post(url, data=data, headers=headers) as resp:
+        async with self.bot.session.post(url, data=form, headers=headers) as resp:
             if resp.status != 200:
                 fmt = 'Failed uploading %s %r to ddnet.tw: %s (status code: %d %s)'
                 log.error(fmt, asset_type, filename, await resp.text(), resp.status, resp.reason)
@@ -128,7 +145,7 @@ class MapTesting(commands.Cog):
 
     async def upload_submission(self, subm: Submission):
         try:
-            await self.ddnet_upload('map', await subm.buffer(), str(subm))
+            await self.ddnet_upload('map', await subm.read(), str(subm))
         except RuntimeError:
             await subm.set_state(SubmissionState.ERROR)
         else:
@@ -155,6 +172,10 @@ class MapTesting(commands.Cog):
 
     @commands.Cog.listener('on_message')
     async def handle_submission(self, message: discord.Message):
+        channel = message.channel
+        if channel.id != CHAN_SUBMIT_MAPS and channel.id not in self._map_channels:
+            return
+
         author = message.author
         if author == self.bot.user:
             return
@@ -162,7 +183,6 @@ class MapTesting(commands.Cog):
         if not has_map(message):
             return
 
-        channel = message.channel
         if channel.id == CHAN_SUBMIT_MAPS:
             isubm = InitialSubmission(message)
             await self.validate_submission(isubm)
@@ -174,7 +194,7 @@ class MapTesting(commands.Cog):
 
             subm = Submission(message)
             if map_channel.filename == str(subm):
-                by_mapper = str(author.id) in map_channel.mapper_mentions
+                by_mapper = author.id in map_channel.mapper_ids
                 if by_mapper and map_channel.state in (MapState.WAITING, MapState.READY):
                     await map_channel.set_state(state=MapState.TESTING)
 
@@ -211,7 +231,7 @@ class MapTesting(commands.Cog):
         if payload.user_id == self.bot.user.id:
             return
 
-        if str(payload.emoji) != str(SubmissionState.VALIDATED):
+        if payload.emoji.name != str(SubmissionState.VALIDATED):
             return
 
         channel = self.bot.get_channel(payload.channel_id)
@@ -243,7 +263,7 @@ class MapTesting(commands.Cog):
             self._active_submissions.add(message.id)
             subm = await isubm.process()
             await isubm.set_state(SubmissionState.PROCESSED)
-            self._map_channels[isubm.map_channel.id] = isubm.map_channel
+            self.add_map_channel(isubm.map_channel)
             self._active_submissions.discard(message.id)
 
         else:
@@ -259,7 +279,7 @@ class MapTesting(commands.Cog):
 
         # system pin messages by ourself
         # messages without a map file by non staff in submit maps channel
-        if (is_testing(channel) and message.type is discord.MessageType.pins_add and message.author.bot) \
+        if (message.type is discord.MessageType.pins_add and author.bot and is_testing(channel)) \
             or (channel.id == CHAN_SUBMIT_MAPS and not has_map(message) and not is_staff(author)):
             await message.delete()
 
@@ -269,7 +289,10 @@ class MapTesting(commands.Cog):
         if payload.user_id == self.bot.user.id:
             return
 
-        if str(payload.emoji) != str(SubmissionState.PROCESSED):
+        if payload.emoji.name != str(SubmissionState.PROCESSED):
+            return
+
+        if payload.channel_id not in (CHAN_INFO, CHAN_SUBMIT_MAPS):
             return
 
         action = payload.event_type
@@ -308,8 +331,7 @@ class MapTesting(commands.Cog):
                 await map_channel.set_permissions(member, read_messages=True)
 
     def get_map_channel_from_ann(self, content: str) -> Optional[MapChannel]:
-        map_url_re = r'\[(?P<name>.+)\]\(<?https://ddnet\.tw/(?:maps|mappreview)/\?map=.+?>?\)'
-        match = re.search(map_url_re, content)
+        match = _MAP_URL_RE.search(content)
         return match and self.get_map_channel(name=match.group('name'))
 
     async def archive_testlog(self, testlog: TestLog) -> bool:
@@ -320,7 +342,7 @@ class MapTesting(commands.Cog):
             f.write(js)
 
         try:
-            await self.ddnet_upload('log', BytesIO(js.encode('utf-8')), testlog.name)
+            await self.ddnet_upload('log', js.encode('utf-8'), testlog.name)
         except RuntimeError:
             failed = True
 
@@ -338,7 +360,7 @@ class MapTesting(commands.Cog):
                     f.write(bytes_)
 
                 try:
-                    await self.ddnet_upload(asset_type, BytesIO(bytes_), filename)
+                    await self.ddnet_upload(asset_type, bytes_, filename)
                 except RuntimeError:
                     failed = True
                     continue
@@ -390,11 +412,12 @@ class MapTesting(commands.Cog):
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
-        try:
-            map_channel = self._map_channels.pop(channel.id)
-        except KeyError:
+        map_channel = self.get_map_channel(channel.id)
+        if map_channel is None:
             return
 
+        self.remove_map_channel(map_channel)
+
         query = 'DELETE FROM waiting_maps where channel_id = $1'
         await self.bot.pool.execute(query, map_channel.id)
 
@@ -465,7 +488,11 @@ class MapTesting(commands.Cog):
         """Change the name of a map"""
         map_channel = self.get_map_channel(ctx.channel.id)
         old_filename = map_channel.filename
-        await map_channel.update(name=name)
+        try:
+            await map_channel.update(name=name)
+        finally:
+            self.remove_map_channel(map_channel, filename=old_filename)
+            self.add_map_channel(map_channel)
 
         try:
             await self.ddnet_delete(old_filename)
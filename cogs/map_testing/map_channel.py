@@ -11,6 +11,10 @@ CAT_MAP_TESTING     = 449352010072850443
 CAT_WAITING_MAPPER  = 746076708196843530
 CAT_EVALUATED_MAPS  = 462954029643989003
 
+_DETAILS_RE = re.compile(r'^"(?P<name>.+)" by (?P<mappers>.+) \[(?P<server>.+)\]$')
+_MAPPERS_SPLIT_RE = re.compile(r', | & ')
+_MENTION_ID_RE = re.compile(r'<@!?([0-9]{17,21})>')
+
 
 class MapState(enum.Enum):
     TESTING     = ''
@@ -27,19 +31,24 @@ class MapChannel:
     def __init__(self, channel: discord.TextChannel):
         self._channel = channel
 
-        self.state = next((s for s in MapState if str(s) == channel.name[0]), MapState.TESTING)
+        try:
+            self.state = MapState(channel.name[0])
+        except ValueError:
+            self.state = MapState.TESTING
 
         try:
             details, _, self.mapper_mentions = channel.topic.splitlines()
         except (AttributeError, IndexError):
             raise ValueError('Malformed channel topic') from None
 
-        match = re.match(r'^"(?P<name>.+)" by (?P<mappers>.+) \[(?P<server>.+)\]$', details.replace('**', ''))
+        self.mapper_ids = frozenset(int(i) for i in _MENTION_ID_RE.findall(self.mapper_mentions))
+
+        match = _DETAILS_RE.match(details.replace('**', ''))
         if match is None:
             raise ValueError('Malformed map details')
 
         self.name = match.group('name')
-        self.mappers = re.split(r', | & ', match.group('mappers'))
+        self.mappers = _MAPPERS_SPLIT_RE.split(match.group('mappers'))
         self.server = match.group('server')
 
     def __getattr__(self, attr: str):
@@ -49,8 +58,13 @@ class MapChannel:
         return str(self.state) + self.emoji + self.filename
 
     @property
-    def filename(self) -> str:
-        return sanitize(self.name)
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+        self.filename = sanitize(value)
 
     @property
     def emoji(self) -> str:
@@ -112,5 +126,6 @@ class MapChannel:
         self.server = isubm.server
         self.state = MapState.TESTING
         self.mapper_mentions = isubm.author.mention
+        self.mapper_ids = frozenset((isubm.author.id,))
         self._channel = await isubm.channel.category.create_text_channel(str(self), topic=self.topic, **options)
         return self
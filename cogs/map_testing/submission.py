@@ -12,6 +12,9 @@ from utils.text import human_join, sanitize
 
 log = logging.getLogger(__name__)
 
+_DETAILS_RE = re.compile(r'^"(?P<name>.+?)" +by +(?P<mappers>.+?) +\[(?P<server>[^\[\]]+)\]\Z', re.IGNORECASE)
+_MAPPERS_SPLIT_RE = re.compile(r', | , | & | and ')
+
 
 class SubmissionState(enum.Enum):
     VALIDATED   = '☑️'
@@ -23,6 +26,9 @@ class SubmissionState(enum.Enum):
         return self.value
 
 
+_STATE_EMOJIS = frozenset(str(s) for s in SubmissionState)
+
+
 class Submission:
     __slots__ = ('message', 'author', 'channel', 'filename', '_bytes')
 
@@ -38,18 +44,21 @@ class Submission:
     def __str__(self) -> str:
         return self.filename[:-4]
 
-    async def buffer(self) -> BytesIO:
+    async def read(self) -> bytes:
         if self._bytes is None:
             self._bytes = await self.message.attachments[0].read()
 
-        return BytesIO(self._bytes)
+        return self._bytes
+
+    async def buffer(self) -> BytesIO:
+        return BytesIO(await self.read())
 
     async def get_file(self) -> discord.File:
         return discord.File(await self.buffer(), filename=self.filename)
 
     async def set_state(self, status: SubmissionState):
         for reaction in self.message.reactions:
-            if any(str(s) == str(reaction) for s in SubmissionState):
+            if reaction.emoji in _STATE_EMOJIS:
                 await self.message.clear_reaction(reaction)
 
         await self.message.add_reaction(str(status))
@@ -69,8 +78,6 @@ class InitialSubmission(Submission):
 
     DIR = 'data/map-testing'
 
-    _FORMAT_RE = r'^\"(?P<name>.+)\" +by +(?P<mappers>.+) +\[(?P<server>.+)\]$'
-
     SERVER_TYPES = {
         'Novice':       '👶',
         'Moderate':     '🌸',
@@ -92,7 +99,7 @@ class InitialSubmission(Submission):
 
     def validate(self):
         # can't do this in init since we need a reference to the submission even if it's improper
-        match = re.search(self._FORMAT_RE, self.message.content, flags=re.IGNORECASE)
+        match = _DETAILS_RE.match(self.message.content)
         if match is None:
             raise ValueError('Your map submission doesn\'t contain correctly formated details')
 
@@ -100,7 +107,7 @@ class InitialSubmission(Submission):
         if sanitize(self.name) != str(self):
             raise ValueError('Name and filename of your map submission don\'t match')
 
-        self.mappers = re.split(r', | , | & | and ', match.group('mappers'))
+        self.mappers = _MAPPERS_SPLIT_RE.split(match.group('mappers'))
 
         self.server = match.group('server').capitalize()
         if self.server not in self.SERVER_TYPES:
@@ -119,9 +126,9 @@ class InitialSubmission(Submission):
     async def generate_thumbnail(self) -> Optional[discord.File]:
         tmp = f'{self.DIR}/tmp/{self.message.id}.map'
 
-        buf = await self.buffer()
+        data = await self.read()
         with open(tmp, 'wb') as f:
-            f.write(buf.getvalue())
+            f.write(data)
 
         try:
             stdout, stderr = await run_process(f'{self.DIR}/render_map {tmp} --size 1280')
@@ -144,10 +151,10 @@ class InitialSubmission(Submission):
 
     async def process(self) -> Submission:
         perms = discord.PermissionOverwrite(read_messages=True)
-        users = [self.message.author]
+        overwrites = {self.message.author: perms}
         for reaction in self.message.reactions:
-            users += await reaction.users().flatten()
-        overwrites = {u: perms for u in users}
+            async for user in reaction.users():
+                overwrites[user] = perms
         # category permissions:
         # - @everyone:  read_messages=False
         # - Tester:     manage_channels=True, read_messages=True, manage_messages=True, manage_roles=True
@@ -98,14 +98,13 @@ class Misc(commands.Cog):
 
         user = user or ctx.author
         avatar = user.avatar_url_as(static_format='png')
-        buf = BytesIO()
         try:
-            await avatar.save(buf)
+            data = await avatar.read()
         except discord.NotFound:
             return await ctx.send('Could not get that user\'s avatar')
 
         ext = 'gif' if user.is_avatar_animated() else 'png'
-        file = discord.File(buf, filename=f'avatar_{user.name}.{ext}')
+        file = discord.File(BytesIO(data), filename=f'avatar_{user.name}.{ext}')
         await ctx.send(file=file)
 
     @avatar.error
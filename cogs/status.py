@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+import itertools
 import logging
-from collections import namedtuple
-from datetime import datetime
-from typing import Dict, List, Optional
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 import discord
+import orjson
 from discord.ext import commands
 
 from data.countryflags import COUNTRYFLAGS, FLAG_UNK
@@ -17,38 +20,58 @@ log = logging.getLogger(__name__)
 
 BASE_URL = 'https://ddnet.tw'
 
+CACHE_TTL = 10.0  # seconds, roughly the server browser refresh interval
 
-class Player:
-    __slots__ = ('name', 'clan', 'score', 'country', 'playing', 'url')
+_UTC = timezone.utc
 
-    def __init__(self, **kwargs):
-        self.name = kwargs.pop('name')
-        self.clan = kwargs.pop('clan')
-        self.score = kwargs.pop('score')
-        self.country = kwargs.pop('country')
-        self.playing = kwargs.pop('playing')
+_INSTAGIB_RE = re.compile(r'idm|itdm|ictf')
+_DDNET_RE = re.compile(r'ddracenet|ddnet|blockz|infectionz')
+_DDRACE_RE = re.compile(r'ddrace|mkrace')
+_RACE_RE = re.compile(r'race|fastcap')
+_TIME_SCORE_RE = re.compile(r'race|fastcap|ddnet|blockz|infectionz')
 
-        try:
-            self.url = BASE_URL + kwargs.pop('url')
-        except KeyError:
-            self.url = None
 
-    def is_connected(self) -> bool:
+def _humanize_pps(pps: int) -> str:
+    if pps < 0:
+        return ''
+
+    for unit in ('', 'k', 'm', 'g'):
+        if pps < 1000:
+            return str(pps) + unit
+
+        pps = round(pps / 1000, 2)
+
+
+class Player:
+    __slots__ = ('name', 'clan', 'score', 'country', 'playing', 'url', 'connected', 'flag', 'time', '_line', '_time_line')
+
+    def __init__(self, *, name: str, clan: str, score: int, country: int, playing: bool, url: Optional[str]=None, **_):
+        self.name = name
+        self.clan = clan
+        self.score = score
+        self.country = country
+        self.playing = playing
+        self.url = None if url is None else BASE_URL + url
+
         # https://github.com/ddnet/ddnet/blob/38f91d3891eefc392f60f77b1b82ecdb3a47ec62/src/engine/client/serverbrowser.cpp#L348
-        return self.name != '(connecting)' or self.clan != '' or self.score != 0 or self.country != -1
+        self.connected = name != '(connecting)' or clan != '' or score != 0 or country != -1
 
-    @property
-    def flag(self) -> str:
-        return COUNTRYFLAGS.get(self.country, FLAG_UNK)
+        self.flag = COUNTRYFLAGS.get(self.country, FLAG_UNK)
 
-    @property
-    def time(self) -> str:
         if self.score == -9999:
-            return '--:--'
+            self.time = '--:--'
         else:
-            return '{0:02d}:{1:02d}'.format(*divmod(abs(self.score), 60))
+            self.time = '{0:02d}:{1:02d}'.format(*divmod(abs(self.score), 60))
+
+        # only players of the displayed server get formatted, so build lines lazily
+        self._line = None
+        self._time_line = None
 
     def format(self, time_score: bool=False) -> str:
+        cached = self._time_line if time_score else self._line
+        if cached is not None:
+            return cached
+
         if self.url is None:
             line = [f'**{escape(self.name)}**']
         else:
@@ -61,32 +84,37 @@ class Player:
             score = self.time if time_score else self.score
             line = [self.flag, f'`{score}`'] + line
 
-        return ' '.join(line)
+        formatted = ' '.join(line)
+        if time_score:
+            self._time_line = formatted
+        else:
+            self._line = formatted
 
+        return formatted
 
-class Server:
-    __slots__ = ('ip', 'port', 'host', 'name', 'map', 'gametype', 'max_players',
-                 'max_clients', '_clients', 'timestamp', 'map_url')
-
-    def __init__(self, **kwargs):
-        self.ip = kwargs.pop('ip')
-        self.port = kwargs.pop('port')
-        self.host = kwargs.pop('host')
-        self.name = kwargs.pop('name')
-        self.map = kwargs.pop('map')
-        self.gametype = kwargs.pop('gametype')
-        self.max_players = kwargs.pop('max_players')
-        self.max_clients = kwargs.pop('max_clients')
-        self._clients = [Player(**p) for p in kwargs.pop('players')]
-        self.timestamp = datetime.utcfromtimestamp(kwargs.pop('timestamp'))
 
-        try:
-            self.map_url = BASE_URL + kwargs.pop('map_url')
-        except KeyError:
-            self.map_url = None
+class Server:
+    __slots__ = ('ip', 'port', 'host', 'name', 'map', 'gametype', '_gametype_lower', 'max_players',
+                 'max_clients', 'clients', '_player_names', 'timestamp', 'map_url')
+
+    def __init__(self, *, ip: str, port: int, host: str, name: str, map: str, gametype: str, max_players: int,
+                 max_clients: int, players: List[Dict], timestamp: float, map_url: Optional[str]=None, **_):
+        self.ip = ip
+        self.port = port
+        self.host = host
+        self.name = name
+        self.map = map
+        self.gametype = gametype
+        self._gametype_lower = gametype.lower()
+        self.max_players = max_players
+        self.max_clients = max_clients
+        self.clients = [p for p in (Player(**p) for p in players) if p.connected]
+        self._player_names = frozenset(p.name for p in self.clients)
+        self.timestamp = datetime.fromtimestamp(timestamp, _UTC)
+        self.map_url = None if map_url is None else BASE_URL + map_url
 
     def __contains__(self, item) -> bool:
-        return any(p.name == item for p in self.clients)
+        return item in self._player_names
 
     @property
     def title(self) -> str:
@@ -100,69 +128,67 @@ class Server:
     def color(self) -> Optional[int]:
         # https://github.com/ddnet/ddnet/blob/f1b54d32b909a3c6fc9e1dc6c37475a1d7c21ec4/src/engine/shared/serverbrowser.cpp
         # https://github.com/ddnet/ddnet/blob/f1b54d32b909a3c6fc9e1dc6c37475a1d7c21ec4/src/game/client/components/menus_browser.cpp#L442-L457
-        gametype = self.gametype.lower()
+        gametype = self._gametype_lower
         if self.gametype in ('DM', 'TDM', 'CTF'):
             return 0x82ff7f  # Vanilla
         elif 'catch' in gametype:
             return 0xfcff7f  # Catch
-        elif any(t in gametype for t in ('idm', 'itdm', 'ictf')):
+        elif _INSTAGIB_RE.search(gametype):
             return 0xff7f7f  # Instagib
         elif 'fng' in gametype:
             return 0xfc7fff  # FNG
-        elif any(t in gametype for t in ('ddracenet', 'ddnet', 'blockz', 'infectionz')):
+        elif _DDNET_RE.search(gametype):
             return 0x7ebffd  # DDNet
-        elif any(t in gametype for t in ('ddrace', 'mkrace')):
+        elif _DDRACE_RE.search(gametype):
             return 0xbf7fff  # DDRace
-        elif any(t in gametype for t in ('race', 'fastcap')):
+        elif _RACE_RE.search(gametype):
             return 0x7fffe0  # Race
 
     @property
     def time_score(self) -> bool:
         # https://github.com/ddnet/ddnet/blob/f1b54d32b909a3c6fc9e1dc6c37475a1d7c21ec4/src/game/client/gameclient.cpp#L1008
-        gametype = self.gametype.lower()
-        return any(t in gametype for t in ('race', 'fastcap', 'ddnet', 'blockz', 'infectionz'))
-
-    @property
-    def clients(self) -> List[Player]:
-        return [p for p in self._clients if p.is_connected()]
+        return _TIME_SCORE_RE.search(self._gametype_lower) is not None
 
     @property
     def embeds(self) -> List[discord.Embed]:
-        embeds = []
+        players, spectators = [], []
+        for client in self.clients:
+            (players if client.playing else spectators).append(client)
 
-        base = discord.Embed(title=self.title, url=self.map_url, timestamp=self.timestamp, color=self.color)
-        base.set_footer(text=self.address)
-
-        spectators = sorted([p for p in self.clients if not p.playing], key=lambda p: p.name.lower())
+        spectators.sort(key=lambda p: p.name.lower())
         if spectators:
-            name = f'Spectators [{len(spectators)}/{self.max_clients}]'
-            value = ', '.join(p.format() for p in spectators)
-            base.add_field(name=name, value=value, inline=False)
+            spectators_name = f'Spectators [{len(spectators)}/{self.max_clients}]'
+            spectators_value = ', '.join(p.format() for p in spectators)
 
         # https://github.com/ddnet/ddnet/blob/38f91d3891eefc392f60f77b1b82ecdb3a47ec62/src/game/client/gameclient.cpp#L1381-L1406
-        players = sorted(
-            [p for p in self.clients if p.playing],
-            key=lambda p: (self.time_score and p.score == -9999, -p.score, p.name.lower())
-        )
-        if players:
-            names = (f'Players [{len(players)}/{self.max_players}]', '\u200b')
-            for i in range(0, len(players), 16):
-                embed = base.copy()
-                for j, name in enumerate(names):
-                    pslice = players[i + 8 * j:i + 8 * (j + 1)]
-                    if pslice:
-                        value = '\n'.join(p.format(self.time_score) for p in pslice)
-                        embed.insert_field_at(j, name=name, value=value)
+        time_score = self.time_score
+        players.sort(key=lambda p: (time_score and p.score == -9999, -p.score, p.name.lower()))
 
-                embeds.append(embed)
+        # build every page from scratch rather than copying a base embed
+        title, color, address = self.title, self.color, self.address
+        players_name = f'Players [{len(players)}/{self.max_players}]'
 
-        return embeds or [base]
+        embeds = []
+        for i in range(0, max(len(players), 1), 16):
+            embed = discord.Embed(title=title, url=self.map_url, timestamp=self.timestamp, color=color)
 
+            left, right = players[i:i + 8], players[i + 8:i + 16]
+            if left:
+                embed.add_field(name=players_name, value='\n'.join(p.format(time_score) for p in left))
+            if right:
+                embed.add_field(name='\u200b', value='\n'.join(p.format(time_score) for p in right))
 
-class ServerInfo:
-    __slots__ = ('host', 'online', 'packets')
+            if spectators:
+                embed.add_field(name=spectators_name, value=spectators_value, inline=False)
+
+            embed.set_footer(text=address)
+            embeds.append(embed)
+
+        return embeds
 
-    Packets = namedtuple('Packets', 'rx tx')
+
+class ServerInfo:
+    __slots__ = ('host', 'online', 'rx', 'tx', 'country', 'flag', '_prefix')
 
     PPS_THRESHOLD = 10000  # china got a lot players
     PPS_RATIO_MIN = 1000  # ratio is not reliable for low traffic
@@ -191,18 +217,31 @@ class ServerInfo:
         'CRI': '🇨🇷',
     }
 
-    def __init__(self, **kwargs):
-        self.host = kwargs.pop('type')
-        self.online = kwargs.pop('online4')
+    def __init__(self, *, type: str, online4: bool, packets_rx: int=-1, packets_tx: int=-1, **_):
+        self.host = type
+        self.online = online4
+
+        self.rx = packets_rx
+        self.tx = packets_tx
+
+        if type == 'ddnet.tw':
+            self.country = 'MAIN'
+        else:
+            self.country = type.split('.')[0].upper() if type else ''
+
+        if self.country in ('MAIN', 'MASTER', 'DB'):
+            self.flag = '🇪🇺'
+        else:
+            self.flag = self.COUNTRYFLAGS.get(self.country[:3], FLAG_UNK)
 
-        self.packets = self.Packets(kwargs.pop('packets_rx', -1), kwargs.pop('packets_tx', -1))
+        self._prefix = f'{self.flag} `{self.country:<6}|'
 
     def __str__(self) -> str:
-        return 'MAIN' if self.host == 'ddnet.tw' else self.host.split('.')[0].upper()
+        return self.country
 
     def is_under_attack(self) -> bool:
-        return self.packets.rx > self.PPS_THRESHOLD \
-            or self.packets.rx > self.PPS_RATIO_MIN and self.packets.rx / self.packets.tx > self.PPS_RATIO_THRESHOLD
+        return self.rx > self.PPS_THRESHOLD \
+            or self.rx > self.PPS_RATIO_MIN and self.rx / self.tx > self.PPS_RATIO_THRESHOLD
 
     @property
     def status(self) -> str:
@@ -213,9 +252,8 @@ class ServerInfo:
         else:
             return 'up'
 
-    @property
-    def flag(self) -> str:
-        return '🇪🇺' if str(self) in ('MAIN', 'MASTER', 'DB') else self.COUNTRYFLAGS.get(str(self)[:3], FLAG_UNK)
+    def format(self) -> str:
+        return f'{self._prefix}{self.status:^4}|{_humanize_pps(self.rx):>7}|{_humanize_pps(self.tx):>7}`'
 
 
 class ServerStatus:
@@ -225,43 +263,46 @@ class ServerStatus:
 
     def __init__(self, servers: List[Dict], updated: str):
         self.servers = [ServerInfo(**s) for s in servers]
-        self.timestamp = datetime.utcfromtimestamp(float(updated))
+        self.timestamp = datetime.fromtimestamp(float(updated), _UTC)
 
     @property
     def embed(self) -> discord.Embed:
-        def humanize_pps(pps: int) -> str:
-            if pps < 0:
-                return ''
-
-            for unit in ('', 'k', 'm', 'g'):
-                if pps < 1000:
-                    return str(pps) + unit
-
-                pps = round(pps / 1000, 2)
+        header = f'{FLAG_UNK} `server| +- | ▲ pps | ▼ pps `'
+        rows = (s.format() for s in self.servers if s.host)
+        description = '\n'.join(itertools.chain((header,), rows))
 
-        rows = [f'{FLAG_UNK} `server| +- | ▲ pps | ▼ pps `']
-        for server in self.servers:
-            if server.host:
-                rows.append(f'{server.flag} `{str(server):<6}|{server.status:^4}|'
-                            f'{humanize_pps(server.packets.rx):>7}|{humanize_pps(server.packets.tx):>7}`')
-
-        return discord.Embed(title='Server Status', description='\n'.join(rows), url=self.URL, timestamp=self.timestamp)
+        return discord.Embed(title='Server Status', description=description, url=self.URL, timestamp=self.timestamp)
 
 
 class Status(commands.Cog, name='DDNet Status'):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+        # (loop time, result) of the last successful fetch, shared by concurrent commands
+        self._servers_cache = None
+        self._servers_lock = asyncio.Lock()
+        self._status_cache = None
+        self._status_lock = asyncio.Lock()
+
+    def _is_fresh(self, cache: Optional[Tuple[float, Any]]) -> bool:
+        return cache is not None and self.bot.loop.time() - cache[0] < CACHE_TTL
+
     async def fetch_servers(self) -> List[Server]:
-        url = f'{BASE_URL}/status/index.json'
-        async with self.bot.session.get(url) as resp:
-            if resp.status != 200:
-                log.error('Failed to fetch DDNet server data (status code: %d %s)', resp.status, resp.reason)
-                raise RuntimeError('Could not fetch DDNet servers')
+        async with self._servers_lock:
+            if self._is_fresh(self._servers_cache):
+                return self._servers_cache[1]
 
-            js = await resp.json()
+            url = f'{BASE_URL}/status/index.json'
+            async with self.bot.session.get(url) as resp:
+                if resp.status != 200:
+                    log.error('Failed to fetch DDNet server data (status code: %d %s)', resp.status, resp.reason)
+                    raise RuntimeError('Could not fetch DDNet servers')
 
-            return [Server(**s) for s in js]
+                js = orjson.loads(await resp.read())
+
+            servers = [Server(**s) for s in js]
+            self._servers_cache = (self.bot.loop.time(), servers)
+            return servers
 
     @commands.command()
     async def find(self, ctx: commands.Context, *, player: clean_content=None):
@@ -283,15 +324,21 @@ class Status(commands.Cog, name='DDNet Status'):
         await menu.start(ctx)
 
     async def fetch_status(self) -> ServerStatus:
-        url = f'{BASE_URL}/status/json/stats.json'
-        async with self.bot.session.get(url) as resp:
-            if resp.status != 200:
-                log.error('Failed to fetch DDNet status data (status code: %d %s)', resp.status, resp.reason)
-                raise RuntimeError('Could not fetch DDNet status')
+        async with self._status_lock:
+            if self._is_fresh(self._status_cache):
+                return self._status_cache[1]
+
+            url = f'{BASE_URL}/status/json/stats.json'
+            async with self.bot.session.get(url) as resp:
+                if resp.status != 200:
+                    log.error('Failed to fetch DDNet status data (status code: %d %s)', resp.status, resp.reason)
+                    raise RuntimeError('Could not fetch DDNet status')
 
-            js = await resp.json()
+                js = orjson.loads(await resp.read())
 
-            return ServerStatus(**js)
+            status = ServerStatus(**js)
+            self._status_cache = (self.bot.loop.time(), status)
+            return status
 
     @commands.command()
     async def ddos(self, ctx: commands.Context):